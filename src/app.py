@@ -5,7 +5,7 @@ from typing import Annotated
 from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
 from src.logging_config import setup_logging
@@ -30,6 +30,15 @@ app.add_middleware(
 BASE_DIR = Path(__file__).parent.parent
 STATIC_DIR = BASE_DIR / "static"
 
+
+def _existing_file(path: Path) -> str | None:
+    return str(path) if path.exists() else None
+
+
+# Resolved once at startup; the UI files don't change while the app is running.
+INDEX_PATH = _existing_file(STATIC_DIR / "index.html")
+METRICS_PATH = _existing_file(STATIC_DIR / "metrics.html")
+
 # Serve static files (UI)
 if STATIC_DIR.exists():
     app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
@@ -48,8 +57,10 @@ def get_rag_pipeline() -> RAGPipeline:
 RAGDep = Annotated[RAGPipeline, Depends(get_rag_pipeline)]
 
 
+# Plain `def` so Starlette runs the blocking OpenAI/Chroma calls in its threadpool
+# instead of stalling the event loop.
 @app.post("/query")
-async def query_endpoint(request: QueryRequest, rag: RAGDep):
+def query_endpoint(request: QueryRequest, rag: RAGDep):
     """Query the RAG system with natural language questions."""
     try:
         return rag.query(request.query, request.hotel_filter)
@@ -57,11 +68,19 @@ async def query_endpoint(request: QueryRequest, rag: RAGDep):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.post("/query/stream")
+def query_stream_endpoint(request: QueryRequest, rag: RAGDep):
+    """Query the RAG system, streaming the answer as server-sent events."""
+    return StreamingResponse(
+        rag.stream_query(request.query, request.hotel_filter),
+        media_type="text/event-stream",
+    )
+
+
 @app.get("/")
 async def root():
-    index_path = STATIC_DIR / "index.html"
-    if index_path.exists():
-        return FileResponse(str(index_path))
+    if INDEX_PATH:
+        return FileResponse(INDEX_PATH)
     else:
         raise HTTPException(
             status_code=404,
@@ -78,8 +97,7 @@ async def metrics_endpoint():
 @app.get("/metrics-page")
 async def metrics_page():
     """Serve the metrics UI page."""
-    metrics_path = STATIC_DIR / "metrics.html"
-    if metrics_path.exists():
-        return FileResponse(str(metrics_path))
+    if METRICS_PATH:
+        return FileResponse(METRICS_PATH)
     else:
         raise HTTPException(status_code=404, detail="Metrics page not found.")
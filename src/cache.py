@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class QueryCache:
+    """
+    Thread-safe LRU cache of pipeline results keyed on (question, hotel_filter).
+
+    Questions are normalized (stripped, lower-cased) so trivially different
+    repeats of the same question share an entry. Entries stored with their query
+    embedding can also be matched semantically: a lookup hits if a cached question
+    with the same hotel filter has cosine similarity >= `similarity_threshold`.
+    A maxsize of 0 disables caching; a threshold of None disables semantic lookup.
+    """
+
+    maxsize: int = 512
+    similarity_threshold: float | None = None
+    # key -> (result, row of `_matrix` holding the entry's embedding, or None).
+    _entries: OrderedDict = field(default_factory=OrderedDict, repr=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+    # Preallocated (maxsize, dim) unit-norm embeddings, one row per entry that has
+    # one; writes and evictions only touch their own row.
+    _matrix: np.ndarray | None = field(default=None, repr=False, compare=False)
+    _row_keys: list = field(default_factory=list, repr=False, compare=False)
+    _row_filters: np.ndarray | None = field(default=None, repr=False, compare=False)
+    _row_used: np.ndarray | None = field(default=None, repr=False, compare=False)
+    _free_rows: list = field(default_factory=list, repr=False, compare=False)
+
+    @staticmethod
+    def make_key(question: str, hotel_filter: str | None) -> tuple[str, str | None]:
+        return question.strip().lower(), hotel_filter
+
+    def get(self, question: str, hotel_filter: str | None = None) -> dict | None:
+        if not self.maxsize:
+            return None
+        key = self.make_key(question, hotel_filter)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        return dict(entry[0])
+
+    def get_similar(
+        self, embedding: list[float], hotel_filter: str | None = None
+    ) -> dict | None:
+        """Returns the most similar cached result for the same hotel filter, if close enough."""
+        if not self.maxsize or self.similarity_threshold is None:
+            return None
+        query_vec = np.asarray(embedding, dtype=np.float32)
+        query_vec /= np.linalg.norm(query_vec) or 1.0
+        with self._lock:
+            if self._matrix is None:
+                return None
+            similarities = self._matrix @ query_vec
+            # Only rows in use and cached under the same hotel filter are candidates.
+            similarities[~self._row_used | (self._row_filters != hotel_filter)] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+            key = self._row_keys[best]
+            self._entries.move_to_end(key)
+            return dict(self._entries[key][0])
+
+    def set(
+        self,
+        question: str,
+        hotel_filter: str | None,
+        result: dict,
+        embedding: list[float] | None = None,
+    ):
+        if not self.maxsize:
+            return
+        key = self.make_key(question, hotel_filter)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._release_row(previous[1])
+            elif len(self._entries) >= self.maxsize:
+                _, (_, row) = self._entries.popitem(last=False)
+                self._release_row(row)
+            row = None if embedding is None else self._write_row(key, embedding)
+            self._entries[key] = (dict(result), row)
+
+    def _write_row(self, key: tuple[str, str | None], embedding: list[float]) -> int:
+        vec = np.asarray(embedding, dtype=np.float32)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.maxsize, vec.shape[0]), dtype=np.float32)
+            self._row_keys = [None] * self.maxsize
+            self._row_filters = np.full(self.maxsize, None, dtype=object)
+            self._row_used = np.zeros(self.maxsize, dtype=bool)
+            self._free_rows = list(range(self.maxsize - 1, -1, -1))
+        row = self._free_rows.pop()
+        self._matrix[row] = vec / (np.linalg.norm(vec) or 1.0)
+        self._row_keys[row] = key
+        self._row_filters[row] = key[1]
+        self._row_used[row] = True
+        return row
+
+    def _release_row(self, row: int | None):
+        if row is None:
+            return
+        self._row_keys[row] = None
+        self._row_filters[row] = None
+        self._row_used[row] = False
+        self._free_rows.append(row)
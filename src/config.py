@@ -3,6 +3,9 @@ from functools import lru_cache
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
+# Upper bounds (in days since review) of the recency buckets 0-3; older reviews are bucket 4.
+RECENCY_BUCKET_DAYS = (30, 90, 180, 365)
+
 
 class Settings(BaseSettings):
     model_config = ConfigDict(env_file=".env", env_file_encoding="utf-8")
@@ -13,9 +16,16 @@ class Settings(BaseSettings):
     vector_store_path: str = "./vector_store"
     collection_name: str = "hotel_reviews"
     data_path: str = "./data/Hotel_Reviews.csv"
-    ingestion_batch_size: int = 100
+    ingestion_batch_size: int = 250
+    ingestion_concurrency: int = 4
     ingestion_sample_size: int | None = None
     recency_weight: float = 0.3
+    speculative_generation: bool = True
+    # Raw Chroma distance (squared L2 on unit-norm embeddings, i.e. 2 * cosine distance)
+    # below which the relevance check is skipped; 0 always runs it.
+    grader_skip_distance: float = 0.5
+    query_cache_size: int = 512
+    semantic_cache_threshold: float | None = 0.97
 
 
 @lru_cache
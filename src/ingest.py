@@ -1,53 +1,156 @@
-import ast
-from datetime import datetime
+import asyncio
+import re
 
 import chromadb
+import numpy as np
 import pandas as pd
 from chromadb.utils import embedding_functions
-
-from config import get_settings
-
-
-def parse_tags(tags_str):
-    """Parse stringified list of tags from CSV."""
-    try:
-        return ast.literal_eval(tags_str)
-    except (ValueError, SyntaxError):
-        return []
+from openai import OpenAI
+
+from config import RECENCY_BUCKET_DAYS, get_settings
+
+# Tags are Python list reprs, which double-quote any tag containing an apostrophe.
+_TAG_RE = re.compile(r"'([^']*)'" r'|"([^"]*)"')
+
+# OpenAI accepts at most 2048 inputs per embeddings request.
+EMBEDDING_BATCH_SIZE = 2048
+
+# Ingestion is re-runnable, so SQLite durability is traded for insert speed.
+# EXCLUSIVE locking is left out because concurrent batches each use their own
+# per-thread connection to the same database file.
+BULK_LOAD_PRAGMAS = (
+    "journal_mode=OFF",
+    "synchronous=OFF",
+    "temp_store=MEMORY",
+    "cache_size=-262144",
+)
+
+# Only the columns used for documents and metadata are parsed from the CSV.
+CSV_COLUMNS = [
+    "Hotel_Name",
+    "Positive_Review",
+    "Negative_Review",
+    "Reviewer_Nationality",
+    "Tags",
+    "Review_Date",
+]
+
+
+def parse_tags(tags):
+    """Parse the stringified tag lists from CSV into comma-separated strings."""
+    return (
+        tags.fillna("")
+        .str.findall(_TAG_RE)
+        .map(lambda matches: ", ".join(single or double for single, double in matches))
+    )
 
 
-def build_document(row):
-    """Combine review fields into a single document string."""
-    return f"Hotel: {row['Hotel_Name']} | Positive: {row['Positive_Review']} | Negative: {row['Negative_Review']}"
+def build_documents(df):
+    """Combine review fields into a single document string per row."""
+    return (
+        "Hotel: "
+        + df["Hotel_Name"].astype(str)
+        + " | Positive: "
+        + df["Positive_Review"].astype(str)
+        + " | Negative: "
+        + df["Negative_Review"].astype(str)
+    )
 
 
-def build_metadata(row):
-    tags = parse_tags(row["Tags"])
+def days_since(review_dates):
+    """Days between each review date and today, parsing every distinct date string once."""
+    dates = pd.to_datetime(review_dates, format="%m/%d/%Y", errors="coerce", cache=True)
+    days = (pd.Timestamp.now().normalize() - dates).dt.days.clip(lower=0)
+    # Unparseable dates count as old reviews; missing dates keep the 0 default.
+    return days.fillna(3650).mask(review_dates.isna(), 0).astype("int32")
+
+
+def build_metadata(df):
+    """Build the per-row Chroma metadata columns for the whole frame at once."""
+    days_since_review = days_since(df["Review_Date"])
+
+    return pd.DataFrame(
+        {
+            "hotel_name": df["Hotel_Name"],
+            "reviewer_nationality": df["Reviewer_Nationality"],
+            "tags": parse_tags(df["Tags"]),
+            "days_since_review": days_since_review,
+            "recency_bucket": np.searchsorted(
+                RECENCY_BUCKET_DAYS, days_since_review, side="left"
+            ),
+        }
+    )
 
-    days_since_review = 0
-    review_date_str = row.get("Review_Date", None)
-    if pd.notna(review_date_str):
-        try:
-            review_date = datetime.strptime(str(review_date_str), "%m/%d/%Y")
-            today = datetime.now()
-            days_since_review = (today - review_date).days
-            days_since_review = max(0, days_since_review)
-        except (ValueError, TypeError) as e:
-            days_since_review = 3650
 
-    return {
-        "hotel_name": row["Hotel_Name"],
-        "reviewer_nationality": row["Reviewer_Nationality"],
-        "tags": ", ".join(tags),
-        "days_since_review": days_since_review,
-    }
+def embed_documents(client, model, documents):
+    """Embed up to EMBEDDING_BATCH_SIZE documents in one OpenAI request."""
+    response = client.embeddings.create(model=model, input=documents)
+    return [item.embedding for item in response.data]
+
+
+def apply_bulk_load_pragmas(client):
+    """Apply the bulk-load pragmas to the calling thread's Chroma connection."""
+    conn = client._server._sysdb._conn_pool.connect()
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+
+
+def add_batch(client, collection, batch):
+    apply_bulk_load_pragmas(client)
+    collection.add(**batch)
+
+
+async def ingest_chunks(
+    client,
+    collection,
+    openai_client,
+    embedding_model,
+    documents,
+    metadata,
+    ids,
+    batch_size,
+    concurrency,
+):
+    """
+    Embed and add documents in EMBEDDING_BATCH_SIZE chunks, with up to `concurrency`
+    chunks in flight. Each chunk is added as soon as it is embedded, so only the
+    in-flight chunks' embeddings are ever held in memory.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    starts = range(0, len(documents), EMBEDDING_BATCH_SIZE)
+    completed = 0
+
+    async def ingest_one(start):
+        nonlocal completed
+        end = min(start + EMBEDDING_BATCH_SIZE, len(documents))
+        async with semaphore:
+            embeddings = await asyncio.to_thread(
+                embed_documents, openai_client, embedding_model, documents[start:end]
+            )
+            for i in range(start, end, batch_size):
+                j = min(i + batch_size, end)
+                batch = {
+                    "documents": documents[i:j],
+                    "embeddings": embeddings[i - start : j - start],
+                    "metadatas": metadata.iloc[i:j].to_dict("records"),
+                    "ids": ids[i:j].tolist(),
+                }
+                await asyncio.to_thread(add_batch, client, collection, batch)
+        completed += 1
+        print(f"  Chunk {completed}/{len(starts)}")
+
+    await asyncio.gather(*(ingest_one(start) for start in starts))
 
 
 def run_ingestion():
     settings = get_settings()
 
     print("Loading dataset...")
-    df = pd.read_csv(settings.data_path)
+    df = pd.read_csv(
+        settings.data_path,
+        usecols=CSV_COLUMNS,
+        dtype={column: str for column in CSV_COLUMNS},
+    )
     if settings.ingestion_sample_size:
         df = df.sample(n=settings.ingestion_sample_size, random_state=42)
 
@@ -60,17 +163,24 @@ def run_ingestion():
         name=settings.collection_name, embedding_function=embedding_fn
     )
 
-    print(f"Ingesting {len(df)} documents...")
-    batch_size = settings.ingestion_batch_size
-    for i in range(0, len(df), batch_size):
-        batch = df.iloc[i : i + batch_size]
-
-        documents = [build_document(row) for _, row in batch.iterrows()]
-        metadatas = [build_metadata(row) for _, row in batch.iterrows()]
-        ids = [str(idx) for idx in batch.index]
-
-        collection.add(documents=documents, metadatas=metadatas, ids=ids)
-        print(f"  Batch {i // batch_size + 1}/{len(df) // batch_size + 1}")
+    documents = build_documents(df).tolist()
+    metadata = build_metadata(df)
+    ids = df.index.astype(str)
+
+    print(f"Embedding and ingesting {len(df)} documents...")
+    asyncio.run(
+        ingest_chunks(
+            client,
+            collection,
+            OpenAI(api_key=settings.openai_api_key),
+            settings.embedding_model,
+            documents,
+            metadata,
+            ids,
+            settings.ingestion_batch_size,
+            settings.ingestion_concurrency,
+        )
+    )
 
     print("Done.")
 
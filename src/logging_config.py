@@ -2,33 +2,31 @@ import logging
 import sys
 from logging import Formatter
 
+# Optional fields passed via `extra=`, emitted in this order when present on a record.
+EXTRA_FIELDS = (
+    "request_id",
+    "query_text",
+    "hotel_filter",
+    "retrieved_doc_count",
+    "grader_decision",
+    "final_latency",
+    "error",
+)
 
-def setup_logging():
-    class StructuredFormatter(Formatter):
-        def format(self, record):
-            log_data = {
-                "timestamp": self.formatTime(record, self.datefmt),
-                "level": record.levelname,
-                "message": record.getMessage(),
-            }
-            if hasattr(record, "request_id"):
-                log_data["request_id"] = record.request_id
-            if hasattr(record, "query_text"):
-                log_data["query_text"] = record.query_text
-            if hasattr(record, "hotel_filter"):
-                log_data["hotel_filter"] = record.hotel_filter
-            if hasattr(record, "retrieved_doc_count"):
-                log_data["retrieved_doc_count"] = record.retrieved_doc_count
-            if hasattr(record, "grader_decision"):
-                log_data["grader_decision"] = record.grader_decision
-            if hasattr(record, "final_latency"):
-                log_data["final_latency"] = record.final_latency
-            if hasattr(record, "error"):
-                log_data["error"] = record.error
 
-            parts = [f"{k}={v}" for k, v in log_data.items()]
-            return " | ".join(parts)
+class StructuredFormatter(Formatter):
+    def format(self, record):
+        fields = record.__dict__
+        parts = [
+            f"timestamp={self.formatTime(record, self.datefmt)}",
+            f"level={record.levelname}",
+            f"message={record.getMessage()}",
+        ]
+        parts.extend(f"{key}={fields[key]}" for key in EXTRA_FIELDS if key in fields)
+        return " | ".join(parts)
+
 
+def setup_logging():
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(StructuredFormatter())
 
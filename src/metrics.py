@@ -1,51 +1,76 @@
+import threading
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Deque, Dict
 
+import numpy as np
 
-@dataclass
+MAX_LATENCY_SAMPLES = 1000
+
+
+@dataclass(slots=True)
 class Metrics:
     request_count: int = 0
     error_count: int = 0
-    latency_samples: List[float] = field(default_factory=list)
+    latency_samples: Deque[float] = field(
+        default_factory=lambda: deque(maxlen=MAX_LATENCY_SAMPLES)
+    )
     retrieval_failures: int = 0
+    cache_hits: int = 0
     total_tokens_input: int = 0
     total_tokens_output: int = 0
+    # Requests are served from a threadpool, so mutations and summary reads are locked.
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
 
     def record_request(
         self, latency: float, tokens_input: int = 0, tokens_output: int = 0
     ):
-        self.request_count += 1
-        self.latency_samples.append(latency)
-        self.total_tokens_input += tokens_input
-        self.total_tokens_output += tokens_output
+        with self._lock:
+            self.request_count += 1
+            self.latency_samples.append(latency)
+            self.total_tokens_input += tokens_input
+            self.total_tokens_output += tokens_output
 
-        if len(self.latency_samples) > 1000:
-            self.latency_samples = self.latency_samples[-1000:]
+    def record_usage(self, tokens_input: int, tokens_output: int):
+        """Adds LLM token usage; called per completion, independently of requests."""
+        with self._lock:
+            self.total_tokens_input += tokens_input
+            self.total_tokens_output += tokens_output
 
     def record_error(self):
-        self.error_count += 1
+        with self._lock:
+            self.error_count += 1
 
     def record_retrieval_failure(self):
-        self.retrieval_failures += 1
+        with self._lock:
+            self.retrieval_failures += 1
+
+    def record_cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
 
     def get_p95_latency(self) -> float:
-        if not self.latency_samples:
+        n_samples = len(self.latency_samples)
+        if not n_samples:
             return 0.0
-        sorted_samples = sorted(self.latency_samples)
-        p95_index = int(len(sorted_samples) * 0.95)
-        return (
-            sorted_samples[p95_index]
-            if p95_index < len(sorted_samples)
-            else sorted_samples[-1]
-        )
+        samples = np.fromiter(self.latency_samples, dtype=np.float64, count=n_samples)
+        p95_index = min(int(n_samples * 0.95), n_samples - 1)
+        # Selection instead of a full sort: only the p95 element needs to be in place.
+        return float(np.partition(samples, p95_index)[p95_index])
 
     def get_retrieval_failure_rate(self) -> float:
         if self.request_count == 0:
             return 0.0
         return self.retrieval_failures / self.request_count
 
+    def get_cache_hit_rate(self) -> float:
+        if self.request_count == 0:
+            return 0.0
+        return self.cache_hits / self.request_count
+
     def get_cost_per_query(self) -> float:
         if self.request_count == 0:
             return 0.0
@@ -56,13 +81,15 @@ class Metrics:
         return total_cost / self.request_count
 
     def get_summary(self) -> Dict[str, float]:
-        return {
-            "request_count": self.request_count,
-            "error_count": self.error_count,
-            "p95_latency_ms": self.get_p95_latency() * 1000,
-            "retrieval_failure_rate": self.get_retrieval_failure_rate(),
-            "cost_per_query_usd": self.get_cost_per_query(),
-        }
+        with self._lock:
+            return {
+                "request_count": self.request_count,
+                "error_count": self.error_count,
+                "p95_latency_ms": self.get_p95_latency() * 1000,
+                "retrieval_failure_rate": self.get_retrieval_failure_rate(),
+                "cache_hit_rate": self.get_cache_hit_rate(),
+                "cost_per_query_usd": self.get_cost_per_query(),
+            }
 
 
 _metrics = Metrics()
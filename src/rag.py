@@ -1,18 +1,159 @@
-import json
 import logging
+import threading
 import time
 import uuid
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator
 
 import chromadb
+import httpx
+import numpy as np
+import orjson
 from chromadb.utils import embedding_functions
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
 
-from src.config import Settings, get_settings
+from src.cache import QueryCache
+from src.config import RECENCY_BUCKET_DAYS, Settings, get_settings
 from src.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
+# Exponential decay: reviews from 0-30 days = 1.0, 30-90 = 0.8, 90-180 = 0.6, etc.
+# This ensures newer reviews are strongly preferred
+RECENCY_BUCKET_SCORES = np.array([1.0, 0.8, 0.6, 0.4, 0.2])
+
+# Shared system prompts. At roughly 60 tokens they are far below the 1024-token
+# minimum for OpenAI's automatic prompt caching, so they get no cache discount.
+RELEVANCE_SYSTEM_PROMPT = (
+    "You are a RAG evaluator. Return JSON with 'is_relevant' (bool). "
+    "Return true if the context contains ANY information that could help answer "
+    "the user's question, even partially. Only return false if the context is "
+    "completely unrelated to the question."
+)
+ANSWER_SYSTEM_PROMPT = (
+    "Answer using ONLY the context. When referencing reviews, "
+    "mention the hotel name(s) being discussed. "
+    "Prioritize information from more recent reviews when available, "
+    "as hotel conditions and services may have changed over time."
+)
+
+# AnyIO's default thread limit, which bounds concurrent sync FastAPI requests.
+REQUEST_THREADS = 40
+# Speculative generations are blocking network calls made from request threads, so
+# the pool matches the request threads rather than the CPU-count default. Requests
+# beyond that generate sequentially instead of queueing behind the pool.
+GENERATION_WORKERS = REQUEST_THREADS
+# Every request thread can be grading while every generation worker is answering,
+# so the shared OpenAI pool keeps that many connections open and alive.
+OPENAI_MAX_CONNECTIONS = REQUEST_THREADS + GENERATION_WORKERS
+# Shared across pipelines so speculative generation doesn't spawn threads per request.
+_generation_executor = ThreadPoolExecutor(
+    max_workers=GENERATION_WORKERS, thread_name_prefix="rag-generate"
+)
+_generation_slots = threading.BoundedSemaphore(GENERATION_WORKERS)
+
+
+@lru_cache
+def get_openai_client(api_key: str) -> OpenAI:
+    """Shared per API key so concurrent requests reuse pooled TCP/TLS connections."""
+    return OpenAI(
+        api_key=api_key,
+        timeout=30,
+        # DefaultHttpxClient keeps the SDK's own transport settings (redirects etc.).
+        http_client=DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            )
+        ),
+    )
+
+
+@lru_cache
+def get_collection(
+    vector_store_path: str, collection_name: str, embedding_model: str, api_key: str
+) -> chromadb.Collection:
+    """Opens each Chroma collection once, however many pipelines are built on it."""
+    chroma_client = chromadb.PersistentClient(path=vector_store_path)
+    embedding_fn = embedding_functions.OpenAIEmbeddingFunction(
+        api_key=api_key,
+        model_name=embedding_model,
+    )
+    return chroma_client.get_collection(
+        collection_name, embedding_function=embedding_fn
+    )
+
+
+def _parse_days(days_since) -> float:
+    if isinstance(days_since, str):
+        try:
+            return int(float(days_since))
+        except (ValueError, TypeError):
+            return 365  # Default to old if can't parse
+    return days_since
+
+
+def rerank_scores(
+    distances: np.ndarray, recency_buckets: np.ndarray, recency_weight: float
+) -> np.ndarray:
+    """
+    Scores candidates as a weighted average of normalized similarity and recency.
+
+    Works on whole candidate arrays so larger pools cost a handful of NumPy passes
+    rather than a Python loop; the computation stays in place on one scratch buffer.
+    """
+    # Normalize semantic similarity (0 to 1, where 1 is most similar)
+    min_distance = distances.min()
+    distance_range = distances.max() - min_distance
+    scores = np.subtract(distances, min_distance)
+    scores /= distance_range if distance_range > 0 else 1.0
+    np.subtract(1.0, scores, out=scores)
+
+    # Combined score: weighted average of similarity and recency (newer = higher)
+    scores *= 1 - recency_weight
+    scores += recency_weight * RECENCY_BUCKET_SCORES[recency_buckets]
+    return scores
+
+
+def build_context(docs: list[str]) -> str:
+    """Joins retrieved documents into the context passed to the grader and generator."""
+    return "\n\n".join(docs)
+
+
+def _answer_messages(query: str, context: str) -> list[dict]:
+    return [
+        {"role": "system", "content": ANSWER_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context: {context}\n\nQuestion: {query}"},
+    ]
+
+
+def _record_usage(usage) -> None:
+    """Records the token usage reported by OpenAI for a chat completion."""
+    if usage is not None:
+        get_metrics().record_usage(usage.prompt_tokens, usage.completion_tokens)
+
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+def _result_events(result: dict) -> Iterator[str]:
+    """Replays a complete query result as the event sequence of a streamed answer."""
+    yield _sse_event("sources", result["sources"])
+    yield _sse_event("token", result["answer"])
+    yield _sse_event("done", {"relevant": result["relevant"]})
+
+
+def _recency_bucket(meta: dict) -> int:
+    """Uses the bucket stored at ingest, falling back to days_since_review for older stores."""
+    bucket = meta.get("recency_bucket")
+    if bucket is None:
+        days_since = _parse_days(meta.get("days_since_review", 0))
+        bucket = np.searchsorted(RECENCY_BUCKET_DAYS, days_since, side="left")
+    return int(bucket)
+
 
 @dataclass
 class RAGPipeline:
@@ -30,36 +171,58 @@ class RAGPipeline:
     client: OpenAI
     collection: chromadb.Collection
     model: str
+    embedding_model: str = "text-embedding-3-small"
     recency_weight: float = 0.3
+    speculative_generation: bool = True
+    grader_skip_distance: float = 0.0
+    cache: QueryCache = field(default_factory=QueryCache)
 
     @classmethod
     def from_settings(cls, settings: Settings | None = None) -> "RAGPipeline":
         """Factory method that builds the pipeline from settings."""
         settings = settings or get_settings()
 
-        client = OpenAI(api_key=settings.openai_api_key)
-        chroma_client = chromadb.PersistentClient(path=settings.vector_store_path)
-        embedding_fn = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=settings.openai_api_key,
-            model_name=settings.embedding_model,
-        )
-        collection = chroma_client.get_collection(
-            settings.collection_name, embedding_function=embedding_fn
-        )
-
         return cls(
-            client=client,
-            collection=collection,
+            client=get_openai_client(settings.openai_api_key),
+            collection=get_collection(
+                settings.vector_store_path,
+                settings.collection_name,
+                settings.embedding_model,
+                settings.openai_api_key,
+            ),
             model=settings.openai_model,
+            embedding_model=settings.embedding_model,
             recency_weight=settings.recency_weight,
+            speculative_generation=settings.speculative_generation,
+            grader_skip_distance=settings.grader_skip_distance,
+            cache=QueryCache(
+                maxsize=settings.query_cache_size,
+                similarity_threshold=settings.semantic_cache_threshold,
+            ),
         )
 
+    def embed_query(self, query: str) -> list[float]:
+        """Embeds the query once so it can be reused for caching and retrieval."""
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        """Embeds several queries in one request, in input order."""
+        try:
+            response = self.client.embeddings.create(
+                model=self.embedding_model, input=queries, timeout=30
+            )
+            return [item.embedding for item in response.data]
+        except Exception as e:
+            logger.error("Query embedding failed: %s", e, exc_info=True)
+            raise RuntimeError(f"Failed to embed query: {str(e)}") from e
+
     def retrieve_documents(
         self,
         query: str,
         hotel_filter: str | None = None,
         k: int = 5,
         recency_weight: float | None = None,
+        query_embedding: list[float] | None = None,
     ) -> list[str]:
         """
         Retrieves documents using Hybrid Search (Vector + Metadata) with recency weighting.
@@ -70,7 +233,28 @@ class RAGPipeline:
             k: Number of documents to return
             recency_weight: Weight for recency (0.0 = no recency, 1.0 = only recency)
                           If None, uses instance default (30% recency, 70% semantic similarity)
+            query_embedding: Precomputed embedding of the query; computed here if None
         """
+        docs, _ = self.retrieve_with_distance(
+            query, hotel_filter, k, recency_weight, query_embedding
+        )
+        return docs
+
+    def retrieve_with_distance(
+        self,
+        query: str,
+        hotel_filter: str | None = None,
+        k: int = 5,
+        recency_weight: float | None = None,
+        query_embedding: list[float] | None = None,
+    ) -> tuple[list[str], float | None]:
+        """
+        Same as `retrieve_documents`, also returning the smallest raw Chroma distance
+        among the candidates (None if nothing was retrieved).
+        """
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+
         try:
             if recency_weight is None:
                 recency_weight = self.recency_weight
@@ -83,105 +267,68 @@ class RAGPipeline:
                 3 if hotel_filter else 2
             )  # More candidates when filtering by hotel
             n_candidates = max(k * candidate_multiplier, 15)  # At least 15 candidates
+            if recency_weight == 0:
+                # Re-ranking can't change Chroma's order, so skip the extra candidates
+                n_candidates = k
 
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[query_embedding],
                 n_results=n_candidates,
                 where=where_clause,
                 include=["documents", "metadatas", "distances"],
             )
 
             if not results["documents"][0]:
-                return []
+                return [], None
 
             # Re-rank by combining semantic similarity with recency
             documents = results["documents"][0]
             metadatas = results["metadatas"][0]
-            distances = results["distances"][0]
+            distances = np.asarray(results["distances"][0], dtype=np.float64)
 
-            # Normalize distances to similarity scores (lower distance = higher similarity)
-            max_distance = max(distances) if distances else 1.0
-            min_distance = min(distances) if distances else 0.0
-            distance_range = (
-                max_distance - min_distance if max_distance > min_distance else 1.0
+            recency_buckets = np.fromiter(
+                (_recency_bucket(meta) for meta in metadatas),
+                dtype=np.intp,
+                count=len(metadatas),
             )
+            combined_scores = rerank_scores(distances, recency_buckets, recency_weight)
 
-            scored_docs = []
-            for doc, meta, dist in zip(documents, metadatas, distances):
-                # Normalize semantic similarity (0 to 1, where 1 is most similar)
-                similarity_score = (
-                    1.0 - ((dist - min_distance) / distance_range)
-                    if distance_range > 0
-                    else 0.5
-                )
-
-                # Calculate recency score (newer reviews = higher score)
-                days_since = meta.get("days_since_review", 0)
-                if isinstance(days_since, str):
-                    try:
-                        days_since = int(float(days_since))
-                    except (ValueError, TypeError):
-                        days_since = 365  # Default to old if can't parse
-
-                # Exponential decay: reviews from 0-30 days = 1.0, 30-90 = 0.8, 90-180 = 0.6, etc.
-                # This ensures newer reviews are strongly preferred
-                if days_since <= 30:
-                    recency_score = 1.0
-                elif days_since <= 90:
-                    recency_score = 0.8
-                elif days_since <= 180:
-                    recency_score = 0.6
-                elif days_since <= 365:
-                    recency_score = 0.4
-                else:
-                    recency_score = 0.2
-
-                # Combined score: weighted average of similarity and recency
-                combined_score = (
-                    1 - recency_weight
-                ) * similarity_score + recency_weight * recency_score
-
-                scored_docs.append((combined_score, doc, meta))
-
-            # Sort by combined score (highest first) and take top k
-            scored_docs.sort(key=lambda x: x[0], reverse=True)
-            top_docs = scored_docs[:k]
+            # Highest score first; a stable sort keeps Chroma's order among ties. The
+            # pool is at most a few dozen candidates, so a full sort is cheaper than
+            # partitioning first.
+            top_indices = np.argsort(-combined_scores, kind="stable")[:k]
+            top_docs = [(documents[i], metadatas[i]) for i in top_indices]
 
             # Combine document text with metadata for richer context
             enriched_docs = []
-            for _, doc, meta in top_docs:
+            for doc, meta in top_docs:
                 days_since = meta.get("days_since_review", "Unknown")
                 reviewer = meta.get("reviewer_nationality", "Unknown").strip()
                 metadata_str = f"[Reviewer from: {reviewer}, {days_since} days ago]"
                 enriched_docs.append(f"{metadata_str} {doc}")
 
-            return enriched_docs
+            return enriched_docs, float(distances.min())
         except Exception as e:
             logger.error("Document retrieval failed: %s", e, exc_info=True)
             raise RuntimeError(f"Failed to retrieve documents: {str(e)}") from e
 
     def check_relevance(self, query: str, context: str) -> bool:
-        system_prompt = (
-            "You are a RAG evaluator. Return JSON with 'is_relevant' (bool). "
-            "Return true if the context contains ANY information that could help answer "
-            "the user's question, even partially. Only return false if the context is "
-            "completely unrelated to the question."
-        )
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": RELEVANCE_SYSTEM_PROMPT},
                     {"role": "user", "content": f"Q: {query}\nContext: {context}"},
                 ],
                 response_format={"type": "json_object"},
                 temperature=0,
                 timeout=30,
             )
-            return json.loads(response.choices[0].message.content).get(
+            _record_usage(response.usage)
+            return orjson.loads(response.choices[0].message.content).get(
                 "is_relevant", True
             )
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.warning("Failed to parse relevance check JSON: %s", e, exc_info=True)
             return True
         except Exception as e:
@@ -192,113 +339,277 @@ class RAGPipeline:
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "Answer using ONLY the context. When referencing reviews, "
-                            "mention the hotel name(s) being discussed. "
-                            "Prioritize information from more recent reviews when available, "
-                            "as hotel conditions and services may have changed over time."
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Context: {context}\n\nQuestion: {query}",
-                    },
-                ],
+                messages=_answer_messages(query, context),
                 timeout=30,
             )
+            _record_usage(response.usage)
             return response.choices[0].message.content
         except Exception as e:
             logger.error("Answer generation failed: %s", e, exc_info=True)
             raise RuntimeError(f"Failed to generate answer: {str(e)}") from e
 
+    def stream_answer(self, query: str, context: str) -> Iterator[str]:
+        """Streams the answer as text deltas; token usage arrives on the final chunk."""
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=_answer_messages(query, context),
+                timeout=30,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.usage is not None:
+                    _record_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error("Answer generation failed: %s", e, exc_info=True)
+            raise RuntimeError(f"Failed to generate answer: {str(e)}") from e
+
+    def skips_grader(self, top_distance: float | None) -> bool:
+        """Whether the best match is close enough that the relevance check is skipped."""
+        return top_distance is not None and top_distance < self.grader_skip_distance
+
+    def generate_if_relevant(
+        self,
+        query: str,
+        context: str,
+        top_distance: float | None = None,
+    ) -> str | None:
+        """
+        Grades the context and generates an answer, or returns None if it is irrelevant.
+
+        The grader is skipped when `top_distance` is below `grader_skip_distance`.
+        With speculative generation enabled, the answer is generated concurrently with
+        the relevance check and discarded if the grader rejects the context, saving one
+        LLM round-trip on the happy path at the cost of wasted tokens on rejections.
+        """
+        if self.skips_grader(top_distance):
+            return self.generate_answer(query, context)
+
+        # Generate sequentially when every speculation slot is busy.
+        speculate = self.speculative_generation and _generation_slots.acquire(
+            blocking=False
+        )
+        if not speculate:
+            if not self.check_relevance(query, context):
+                return None
+            return self.generate_answer(query, context)
+
+        answer_future = _generation_executor.submit(
+            self.generate_answer, query, context
+        )
+        answer_future.add_done_callback(lambda _: _generation_slots.release())
+        if not self.check_relevance(query, context):
+            answer_future.cancel()
+            return None
+        return answer_future.result()
+
     def query(self, question: str, hotel_filter: str | None = None) -> dict:
         request_id = str(uuid.uuid4())
-        start_time = time.time()
-        metrics = get_metrics()
+        start_time = time.perf_counter()
 
         try:
-            logger.info(
-                "Request started",
-                extra={
-                    "request_id": request_id,
-                    "query_text": question,
-                    "hotel_filter": hotel_filter,
-                },
+            self._log_start(request_id, question, hotel_filter)
+
+            cached, query_embedding = self._lookup_cache(
+                question, hotel_filter, request_id, start_time
             )
+            if cached is not None:
+                return cached
 
-            docs = self.retrieve_documents(question, hotel_filter)
+            docs, top_distance = self.retrieve_with_distance(
+                question, hotel_filter, query_embedding=query_embedding
+            )
             if not docs:
-                latency = time.time() - start_time
-                metrics.record_retrieval_failure()
-                metrics.record_request(latency, 0, 0)
-                logger.info(
-                    "No documents retrieved",
-                    extra={"request_id": request_id, "retrieved_doc_count": 0},
-                )
-                return {
-                    "answer": "No documents found.",
-                    "sources": [],
-                    "relevant": False,
-                }
-
-            context = "\n\n".join(docs)
-            is_relevant = self.check_relevance(question, context)
-
-            if not is_relevant:
-                latency = time.time() - start_time
-                metrics.record_retrieval_failure()
-                # Estimate token usage for relevance check
-                tokens_input = len(question) + len(context) // 4
-                metrics.record_request(latency, tokens_input, 0)
-                logger.info(
-                    "Retrieval failed relevance check",
-                    extra={
-                        "request_id": request_id,
-                        "retrieved_doc_count": len(docs),
-                        "grader_decision": False,
-                    },
-                )
-                return {
-                    "answer": "Found documents but they don't answer your question.",
-                    "sources": [],
-                    "relevant": False,
-                }
+                return self._unanswered(0, request_id, start_time)
 
-            answer = self.generate_answer(question, context)
-            latency = time.time() - start_time
+            context = build_context(docs)
+            answer = self.generate_if_relevant(
+                question, context, top_distance=top_distance
+            )
+            if answer is None:
+                return self._unanswered(len(docs), request_id, start_time)
+
+            return self._answered(
+                question,
+                hotel_filter,
+                query_embedding,
+                docs,
+                answer,
+                request_id,
+                start_time,
+            )
 
-            # Estimate token usage (rough approximation: ~4 chars per token)
-            tokens_input = len(question) + len(context) // 4
-            tokens_output = len(answer) // 4
+        except Exception as e:
+            self._log_failure(e, request_id, start_time)
+            raise
 
-            metrics.record_request(latency, tokens_input, tokens_output)
+    def stream_query(
+        self, question: str, hotel_filter: str | None = None
+    ) -> Iterator[str]:
+        """
+        Runs the pipeline like `query`, streaming the result as server-sent events.
 
-            logger.info(
-                "Request completed",
-                extra={
-                    "request_id": request_id,
-                    "retrieved_doc_count": len(docs),
-                    "grader_decision": True,
-                    "final_latency": latency,
-                },
+        Emits a `sources` event with the retrieved documents, `token` events as the
+        answer is generated, then a `done` event carrying the relevance flag. Failures
+        are reported as an `error` event since the response has already started.
+        """
+        request_id = str(uuid.uuid4())
+        start_time = time.perf_counter()
+
+        try:
+            self._log_start(request_id, question, hotel_filter)
+
+            cached, query_embedding = self._lookup_cache(
+                question, hotel_filter, request_id, start_time
             )
+            if cached is not None:
+                yield from _result_events(cached)
+                return
 
-            return {"answer": answer, "sources": docs, "relevant": True}
+            docs, top_distance = self.retrieve_with_distance(
+                question, hotel_filter, query_embedding=query_embedding
+            )
+            if not docs:
+                yield from _result_events(self._unanswered(0, request_id, start_time))
+                return
+
+            context = build_context(docs)
+            if not self.skips_grader(top_distance) and not self.check_relevance(
+                question, context
+            ):
+                yield from _result_events(
+                    self._unanswered(len(docs), request_id, start_time)
+                )
+                return
+
+            yield _sse_event("sources", docs)
+            chunks = []
+            for token in self.stream_answer(question, context):
+                chunks.append(token)
+                yield _sse_event("token", token)
+
+            self._answered(
+                question,
+                hotel_filter,
+                query_embedding,
+                docs,
+                "".join(chunks),
+                request_id,
+                start_time,
+            )
+            yield _sse_event("done", {"relevant": True})
 
         except Exception as e:
-            metrics.record_error()
-            latency = time.time() - start_time
-            metrics.record_request(latency, 0, 0)
-            logger.error(
-                "Request failed",
+            self._log_failure(e, request_id, start_time)
+            yield _sse_event("error", f"Internal server error: {str(e)}")
+
+    def _log_start(self, request_id: str, question: str, hotel_filter: str | None):
+        logger.info(
+            "Request started",
+            extra={
+                "request_id": request_id,
+                "query_text": question,
+                "hotel_filter": hotel_filter,
+            },
+        )
+
+    def _lookup_cache(
+        self,
+        question: str,
+        hotel_filter: str | None,
+        request_id: str,
+        start_time: float,
+    ) -> tuple[dict | None, list[float] | None]:
+        """Returns a cached result if any, plus the query embedding computed on a miss."""
+        query_embedding = None
+        cached = self.cache.get(question, hotel_filter)
+        if cached is None:
+            query_embedding = self.embed_query(question)
+            cached = self.cache.get_similar(query_embedding, hotel_filter)
+        if cached is not None:
+            latency = time.perf_counter() - start_time
+            metrics = get_metrics()
+            metrics.record_cache_hit()
+            metrics.record_request(latency)
+            logger.info(
+                "Request served from cache",
+                extra={"request_id": request_id, "final_latency": latency},
+            )
+        return cached, query_embedding
+
+    def _unanswered(
+        self, retrieved_doc_count: int, request_id: str, start_time: float
+    ) -> dict:
+        """
+        Records a retrieval failure: nothing retrieved, or rejected by the grader.
+
+        These results are not cached, so a one-off grader false negative isn't served
+        again and every failure still counts toward the retrieval failure rate.
+        """
+        latency = time.perf_counter() - start_time
+        metrics = get_metrics()
+        metrics.record_retrieval_failure()
+        metrics.record_request(latency)
+
+        if retrieved_doc_count == 0:
+            logger.info(
+                "No documents retrieved",
+                extra={"request_id": request_id, "retrieved_doc_count": 0},
+            )
+            answer = "No documents found."
+        else:
+            logger.info(
+                "Retrieval failed relevance check",
                 extra={
                     "request_id": request_id,
-                    "error": str(e),
-                    "final_latency": latency,
+                    "retrieved_doc_count": retrieved_doc_count,
+                    "grader_decision": False,
                 },
-                exc_info=True,
             )
-            raise
+            answer = "Found documents but they don't answer your question."
+
+        return {"answer": answer, "sources": [], "relevant": False}
+
+    def _answered(
+        self,
+        question: str,
+        hotel_filter: str | None,
+        query_embedding: list[float] | None,
+        docs: list[str],
+        answer: str,
+        request_id: str,
+        start_time: float,
+    ) -> dict:
+        latency = time.perf_counter() - start_time
+        get_metrics().record_request(latency)
+        logger.info(
+            "Request completed",
+            extra={
+                "request_id": request_id,
+                "retrieved_doc_count": len(docs),
+                "grader_decision": True,
+                "final_latency": latency,
+            },
+        )
+
+        result = {"answer": answer, "sources": docs, "relevant": True}
+        self.cache.set(question, hotel_filter, result, query_embedding)
+        return result
+
+    def _log_failure(self, error: Exception, request_id: str, start_time: float):
+        metrics = get_metrics()
+        metrics.record_error()
+        latency = time.perf_counter() - start_time
+        metrics.record_request(latency)
+        logger.error(
+            "Request failed",
+            extra={
+                "request_id": request_id,
+                "error": str(error),
+                "final_latency": latency,
+            },
+            exc_info=True,
+        )
@@ -0,0 +1,85 @@
+from src.cache import QueryCache
+
+RESULT = {"answer": "Great breakfast.", "sources": ["doc"], "relevant": True}
+
+
+def test_questions_are_normalized():
+    cache = QueryCache()
+    cache.set("  Is the Breakfast good? ", None, RESULT)
+
+    assert cache.get("is the breakfast good?") == RESULT
+    assert cache.get("Is the breakfast good?", "Hotel Arena") is None
+
+
+def test_get_returns_a_copy():
+    cache = QueryCache()
+    cache.set("q", None, RESULT)
+
+    cache.get("q")["answer"] = "changed"
+
+    assert cache.get("q") == RESULT
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(maxsize=2)
+    cache.set("a", None, {"answer": "a"})
+    cache.set("b", None, {"answer": "b"})
+    cache.get("a")
+    cache.set("c", None, {"answer": "c"})
+
+    assert cache.get("a") == {"answer": "a"}
+    assert cache.get("b") is None
+    assert cache.get("c") == {"answer": "c"}
+
+
+def test_maxsize_zero_disables_cache():
+    cache = QueryCache(maxsize=0, similarity_threshold=0.9)
+    cache.set("q", None, RESULT, embedding=[1.0, 0.0])
+
+    assert cache.get("q") is None
+    assert cache.get_similar([1.0, 0.0]) is None
+
+
+def test_threshold_none_disables_semantic_lookup():
+    cache = QueryCache(similarity_threshold=None)
+    cache.set("q", None, RESULT, embedding=[1.0, 0.0])
+
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert cache.get("q") == RESULT
+
+
+def test_similar_embedding_hits_above_threshold():
+    cache = QueryCache(similarity_threshold=0.9)
+    cache.set("breakfast?", None, RESULT, embedding=[1.0, 0.0, 0.0])
+
+    assert cache.get_similar([2.0, 0.1, 0.0]) == RESULT
+    assert cache.get_similar([1.0, 1.0, 0.0]) is None
+
+
+def test_similar_lookup_is_isolated_by_hotel_filter():
+    cache = QueryCache(similarity_threshold=0.9)
+    cache.set("breakfast?", "Hotel Arena", {"answer": "arena"}, embedding=[1.0, 0.0])
+    cache.set("breakfast?", None, {"answer": "any"}, embedding=[0.0, 1.0])
+
+    assert cache.get_similar([1.0, 0.0], "Hotel Arena") == {"answer": "arena"}
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert cache.get_similar([1.0, 0.0], "Other Hotel") is None
+    assert cache.get_similar([0.0, 1.0]) == {"answer": "any"}
+
+
+def test_evicted_entries_are_not_matched_semantically():
+    cache = QueryCache(maxsize=1, similarity_threshold=0.9)
+    cache.set("old", None, {"answer": "old"}, embedding=[1.0, 0.0])
+    cache.set("new", None, {"answer": "new"}, embedding=[0.0, 1.0])
+
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert cache.get_similar([0.0, 1.0]) == {"answer": "new"}
+
+
+def test_overwrite_without_embedding_drops_semantic_match():
+    cache = QueryCache(similarity_threshold=0.9)
+    cache.set("q", None, {"answer": "v1"}, embedding=[1.0, 0.0])
+    cache.set("q", None, {"answer": "v2"})
+
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert cache.get("q") == {"answer": "v2"}
@@ -1,67 +1,343 @@
-import json
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+import httpx
+import orjson
 import pytest
 from openai import OpenAI
 
 from src.config import get_settings
-from src.rag import RAGPipeline
+from src.rag import RAGPipeline, build_context
 
 settings = get_settings()
-client = OpenAI(api_key=settings.openai_api_key)
+log = logging.getLogger("rag_eval")
+log.setLevel(logging.INFO)
 
+JUDGE_MODEL = "gpt-4o-mini"
+# Fixed sampling seed so repeated judge calls are reproducible.
+JUDGE_SEED = 0
+# Golden-set cases run concurrently when pre-computed for batch judging.
+CASE_CONCURRENCY = 8
+JUDGE_SYSTEM_PROMPT = (
+    "You are a QA evaluator. Check if the answer helps the user "
+    "and mentions the expected concept. Grade it 'PASS' or 'FAIL'."
+)
+# Structured output restricts the judge to a single enum field, so no free text
+# needs stripping and the completion stays a handful of tokens.
+JUDGE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "grade",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"grade": {"type": "string", "enum": ["PASS", "FAIL"]}},
+            "required": ["grade"],
+            "additionalProperties": False,
+        },
+    },
+}
 
+
+@lru_cache(maxsize=1)
 def load_golden_set():
     path = Path(__file__).parent / "golden_set.json"
-    with open(path) as f:
-        return json.load(f)
+    return orjson.loads(path.read_bytes())
 
 
-def llm_judge(question: str, answer: str, expected_concept: str) -> str:
-    """Use an LLM to evaluate if the answer addresses the question and mentions the expected concept."""
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a QA evaluator. Check if the answer helps the user "
-                    "and mentions the expected concept. Return ONLY 'PASS' or 'FAIL'."
-                ),
-            },
+def judge_params(question: str, answer: str, expected_concept: str) -> dict:
+    """Chat completion parameters for one judge call, shared by inline and batch grading."""
+    return {
+        "model": JUDGE_MODEL,
+        "messages": [
+            {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
             {
                 "role": "user",
                 "content": f"Question: {question}\nAnswer: {answer}\nExpected concept: {expected_concept}",
             },
         ],
-        temperature=0,
+        "response_format": JUDGE_RESPONSE_FORMAT,
+        "max_tokens": 10,
+        "temperature": 0,
+        "seed": JUDGE_SEED,
+    }
+
+
+# Strict schema output is byte-for-byte one of these, so the common case is a
+# dict lookup rather than a JSON parse.
+_GRADE_PAYLOADS = {f'{{"grade":"{grade}"}}': grade for grade in ("PASS", "FAIL")}
+
+
+def parse_grade(content: str) -> str:
+    """Read the grade from a structured judge completion."""
+    grade = _GRADE_PAYLOADS.get(content)
+    return grade if grade is not None else orjson.loads(content)["grade"]
+
+
+def judge_cache_key(question: str, answer: str, expected_concept: str) -> str:
+    """
+    Content-addressed pytest cache key for one judge call. It hashes the full request
+    parameters, so any change to the judge model, prompt, schema or sampling
+    re-grades everything.
+    """
+    params = judge_params(question, answer, expected_concept)
+    digest = hashlib.blake2b(
+        orjson.dumps(params, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).hexdigest()
+    return f"llm_judge/{digest}"
+
+
+def llm_judge(
+    client: OpenAI,
+    question: str,
+    answer: str,
+    expected_concept: str,
+    cache: pytest.Cache | None = None,
+) -> str:
+    """Use an LLM to evaluate if the answer addresses the question and mentions the expected concept."""
+    key = judge_cache_key(question, answer, expected_concept)
+    if cache is not None:
+        grade = cache.get(key, None)
+        if grade is not None:
+            return grade
+
+    response = client.chat.completions.create(
+        **judge_params(question, answer, expected_concept)
     )
-    return response.choices[0].message.content.strip()
+    grade = parse_grade(response.choices[0].message.content)
+    if cache is not None:
+        cache.set(key, grade)
+    return grade
+
+
+def build_judge_request(
+    custom_id: str, question: str, answer: str, expected_concept: str
+) -> dict:
+    """Build one line of an OpenAI Batch API input file for the judge."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": judge_params(question, answer, expected_concept),
+    }
+
+
+def submit_judge_batch(
+    client: OpenAI, requests: list[dict], poll_interval: float = 10
+) -> dict:
+    """Grade all requests in a single Batch API job; returns {custom_id: grade}."""
+    batch_input = b"\n".join(orjson.dumps(request) for request in requests)
+    batch_file = client.files.create(
+        file=("judge_batch.jsonl", batch_input), purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+    if batch.status != "completed":
+        raise RuntimeError(f"Judge batch {batch.id} ended with status {batch.status}")
+
+    grades, errors = {}, {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id is None:
+            continue
+        for line in client.files.content(file_id).content.splitlines():
+            result = orjson.loads(line)
+            body = (result.get("response") or {}).get("body") or {}
+            if body.get("choices"):
+                grades[result["custom_id"]] = parse_grade(
+                    body["choices"][0]["message"]["content"]
+                )
+            else:
+                errors[result["custom_id"]] = result.get("error") or body.get("error")
 
+    # A request the judge never graded is an infrastructure failure, not a failing
+    # answer, so surface it rather than letting those cases fail as quality regressions.
+    missing = [r["custom_id"] for r in requests if r["custom_id"] not in grades]
+    if missing:
+        details = "; ".join(
+            f"{custom_id}: {errors.get(custom_id, 'no result returned')}"
+            for custom_id in missing
+        )
+        raise RuntimeError(f"Judge batch {batch.id} left requests ungraded: {details}")
+    return grades
 
-@pytest.fixture(scope="module")
+
+def run_case(
+    pipeline: RAGPipeline,
+    test_case: dict,
+    query_embedding: list[float] | None = None,
+) -> tuple[list[str], str]:
+    """
+    Run the RAG steps for one golden-set case, returning (docs, answer).
+
+    Follows the path `/query` serves: the relevance check is skipped for close
+    matches, and otherwise runs concurrently with a speculative answer that is
+    discarded if the grader rejects the context.
+    """
+    question = test_case["question"]
+    docs, top_distance = pipeline.retrieve_with_distance(
+        question, test_case.get("hotel_filter"), query_embedding=query_embedding
+    )
+    if not docs:
+        return docs, "FALLBACK: No documents retrieved."
+    context = build_context(docs)
+
+    answer = pipeline.generate_if_relevant(question, context, top_distance=top_distance)
+    if answer is None:
+        answer = "FALLBACK: Irrelevant context."
+    return docs, answer
+
+
+@pytest.fixture(scope="session")
+def judge_client():
+    """One judge client per session, keeping a warm HTTP/2 connection for all cases."""
+    http_client = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=32, max_connections=32, keepalive_expiry=60.0
+        ),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    )
+    client = OpenAI(api_key=settings.openai_api_key, http_client=http_client)
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def judge_cache(request):
+    """
+    With LLM_JUDGE_CACHE=1, reuse judge grades for unchanged (question, answer,
+    concept) triples across runs via pytest's on-disk cache. Unset it to re-grade.
+    """
+    if os.environ.get("LLM_JUDGE_CACHE") != "1":
+        return None
+    return getattr(request.config, "cache", None)
+
+
+@pytest.fixture(scope="session")
 def pipeline():
-    return RAGPipeline.from_settings()
+    pipeline = RAGPipeline.from_settings()
+    # Warm up the HTTP pool and Chroma's index so the first case isn't charged for it.
+    pipeline.retrieve_documents("warmup")
+    return pipeline
+
+
+@pytest.fixture(scope="session")
+def query_embeddings(pipeline):
+    """
+    Embed every golden-set question in one request, mapping case id -> embedding, so
+    cases don't each pay an embedding round-trip. Searches stay per case because
+    each one carries its own hotel filter.
+    """
+    golden_set = load_golden_set()
+    embeddings = pipeline.embed_queries([tc["question"] for tc in golden_set])
+    return {str(i): embedding for i, embedding in enumerate(embeddings)}
+
+
+@pytest.fixture(scope="session")
+def batch_results(pipeline, query_embeddings, judge_client, judge_cache):
+    """
+    With LLM_JUDGE_BATCH=1, run every case up front and grade them all in one Batch API
+    job, mapping case id -> (docs, answer, grade). Otherwise None and each test grades
+    inline. Batch mode refuses to run under xdist, since every worker would re-run
+    all cases and submit its own batch.
+    """
+    if os.environ.get("LLM_JUDGE_BATCH") != "1":
+        return None
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        pytest.fail(
+            "LLM_JUDGE_BATCH=1 can't be combined with pytest -n: each worker would "
+            "submit its own full batch. Run batch mode without xdist.",
+            pytrace=False,
+        )
 
+    golden_set = load_golden_set()
+    with ThreadPoolExecutor(max_workers=CASE_CONCURRENCY) as executor:
+        outputs = executor.map(
+            lambda i, tc: run_case(pipeline, tc, query_embeddings[str(i)]),
+            range(len(golden_set)),
+            golden_set,
+        )
+        cases = {
+            str(i): (test_case, *output)
+            for i, (test_case, output) in enumerate(zip(golden_set, outputs))
+        }
+    cache_keys = {
+        case_id: judge_cache_key(
+            test_case["question"], answer, test_case["expected_concept"]
+        )
+        for case_id, (test_case, _, answer) in cases.items()
+    }
+    grades = {}
+    if judge_cache is not None:
+        for case_id, key in cache_keys.items():
+            grade = judge_cache.get(key, None)
+            if grade is not None:
+                grades[case_id] = grade
 
-@pytest.mark.parametrize("test_case", load_golden_set())
-def test_rag_quality(test_case, pipeline):
+    pending = [
+        build_judge_request(
+            case_id, test_case["question"], answer, test_case["expected_concept"]
+        )
+        for case_id, (test_case, _, answer) in cases.items()
+        if case_id not in grades
+    ]
+    if pending:
+        batch_grades = submit_judge_batch(judge_client, pending)
+        if judge_cache is not None:
+            for case_id, grade in batch_grades.items():
+                judge_cache.set(cache_keys[case_id], grade)
+        grades.update(batch_grades)
+
+    return {
+        case_id: (docs, answer, grades.get(case_id))
+        for case_id, (_, docs, answer) in cases.items()
+    }
+
+
+@pytest.mark.parametrize(
+    "case_id, test_case",
+    [(str(i), test_case) for i, test_case in enumerate(load_golden_set())],
+    ids=[f"test_case{i}" for i in range(len(load_golden_set()))],
+)
+def test_rag_quality(
+    case_id,
+    test_case,
+    pipeline,
+    query_embeddings,
+    batch_results,
+    judge_client,
+    judge_cache,
+):
     """Run the full RAG pipeline and grade output quality using LLM-as-a-Judge."""
     question = test_case["question"]
-    hotel_filter = test_case.get("hotel_filter")
 
-    docs = pipeline.retrieve_documents(question, hotel_filter)
-    context = "\n\n".join(docs)
-
-    if pipeline.check_relevance(question, context):
-        answer = pipeline.generate_answer(question, context)
+    if batch_results is None:
+        docs, answer = run_case(pipeline, test_case, query_embeddings[case_id])
     else:
-        answer = "FALLBACK: Irrelevant context."
+        docs, answer, grade = batch_results[case_id]
 
-    print(f"\nQ: {question}\nA: {answer}")
+    log.info("Q: %s\nA: %s", question, answer)
 
     if "FALLBACK" not in answer:
         assert docs, "Retrieval returned no documents"
 
-    grade = llm_judge(question, answer, test_case["expected_concept"])
+    if batch_results is None:
+        grade = llm_judge(
+            judge_client,
+            question,
+            answer,
+            test_case["expected_concept"],
+            cache=judge_cache,
+        )
     assert grade == "PASS", f"LLM Judge failed. Answer: {answer}"